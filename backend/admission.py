@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from backend.cache import TTLCache
+
+# Concurrent model evaluations, and how many more may wait for a slot
+INFERENCE_MAX_CONCURRENCY = int(os.getenv("INFERENCE_MAX_CONCURRENCY", "4"))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "16"))
+INFERENCE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_QUEUE_TIMEOUT_SECONDS", "0.5"))
+# Per-client token bucket for prediction endpoints
+RATE_LIMIT_PER_SECOND = float(os.getenv("PREDICTION_RATE_LIMIT_PER_SECOND", "10"))
+RATE_LIMIT_BURST = int(os.getenv("PREDICTION_RATE_LIMIT_BURST", "30"))
+RATE_LIMIT_MAX_CLIENTS = 10000
+# How long the last forecast for a zone may be served in degraded mode
+FORECAST_CACHE_TTL_SECONDS = int(os.getenv("FORECAST_CACHE_TTL_SECONDS", "3600"))
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class InferenceLimiter:
+    """Caps concurrent model evaluations behind a bounded wait queue."""
+
+    def __init__(self, max_concurrency=INFERENCE_MAX_CONCURRENCY, max_queue=INFERENCE_MAX_QUEUE,
+                 timeout=INFERENCE_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.shed_queue_full += 1
+                raise Overloaded("queue_full")
+            self._waiting += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self.shed_timeout += 1
+            else:
+                self._in_flight += 1
+                self.admitted += 1
+        if not acquired:
+            raise Overloaded("queue_timeout")
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "admitted": self.admitted,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_timeout": self.shed_timeout,
+            }
+
+
+class RateLimiter:
+    """Token bucket per client key."""
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST, max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        # Idle clients age out once their bucket would have refilled anyway
+        self._buckets = TTLCache(max_entries=max_clients, ttl_seconds=max(60.0, burst / rate if rate else 60.0))
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def allow(self, key: str, cost: float = 1.0) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            else:
+                self.limited += 1
+            self._buckets.set(key, (tokens, now))
+        return allowed
+
+    def stats(self):
+        return {"clients": len(self._buckets), "rate_limited": self.limited}
+
+
+class ForecastCache:
+    """Last computed forecast per zone, served with a stale flag under overload."""
+
+    def __init__(self, ttl_seconds=FORECAST_CACHE_TTL_SECONDS):
+        self._entries = TTLCache(max_entries=100000, ttl_seconds=ttl_seconds)
+        self.served_stale = 0
+
+    def put(self, zone_id: str, forecast: dict):
+        self._entries.set(zone_id, forecast)
+
+    def get(self, zone_id: str):
+        return self._entries.get(zone_id)
+
+    def mark_served(self, count: int = 1):
+        self.served_stale += count
+
+    def stats(self):
+        return {"zones": len(self._entries), "served_stale": self.served_stale}
+
+
+inference_limiter = InferenceLimiter()
+rate_limiter = RateLimiter()
+forecast_cache = ForecastCache()
+
+
+def stats():
+    return {
+        "inference": inference_limiter.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "forecast_cache": forecast_cache.stats(),
+    }
@@ -0,0 +1,137 @@
+import datetime
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy.orm import Session
+from backend.database import SessionLocal
+from backend import models
+
+# Cold occupancy history lives in Parquet, partitioned by zone and month:
+#   <ARCHIVE_DIR>/zone_id=ZONE_001/month=2026-01/part-*.parquet
+ARCHIVE_DIR = os.getenv("OCCUPANCY_ARCHIVE_DIR", "backend/archive/occupancy")
+# Rows older than this move out of the primary database
+ARCHIVE_HORIZON_DAYS = int(os.getenv("OCCUPANCY_ARCHIVE_HORIZON_DAYS", "90"))
+# The API reads up to 7 days of history, so never archive anything newer
+MIN_HORIZON_DAYS = 7
+ARCHIVE_CHUNK_SIZE = 50000
+ROW_KEY = ("id", "zone_id", "timestamp")
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("zone_id", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("occupied_spots", pa.int32()),
+    ("total_capacity", pa.int32()),
+    ("occupancy_percentage", pa.float64()),
+    ("data_source", pa.string()),
+    ("month", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("zone_id", pa.string()), ("month", pa.string())]), flavor="hive"
+)
+
+
+def _write_chunk(rows):
+    table = pa.Table.from_pylist([
+        {
+            "id": r.id,
+            "zone_id": r.zone_id,
+            "timestamp": r.timestamp,
+            "occupied_spots": r.occupied_spots,
+            "total_capacity": r.total_capacity,
+            "occupancy_percentage": r.occupancy_percentage,
+            "data_source": r.data_source,
+            "month": r.timestamp.strftime("%Y-%m"),
+        } for r in rows
+    ], schema=ARCHIVE_SCHEMA)
+    ds.write_dataset(
+        table,
+        ARCHIVE_DIR,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def archive_occupancy(db: Session, horizon_days: int = ARCHIVE_HORIZON_DAYS, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+    """Move occupancy rows older than the horizon to Parquet; returns rows archived.
+
+    Each chunk is written before its rows are deleted, so an interrupted
+    run can leave duplicates in the archive but never loses data. Readers
+    de-duplicate on (id, zone_id, timestamp), since SQLite hands out ids of
+    deleted rows again once the hot table has been emptied.
+    """
+    horizon_days = max(horizon_days, MIN_HORIZON_DAYS)
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=horizon_days)
+    columns = (
+        models.Occupancy.id,
+        models.Occupancy.zone_id,
+        models.Occupancy.timestamp,
+        models.Occupancy.occupied_spots,
+        models.Occupancy.total_capacity,
+        models.Occupancy.occupancy_percentage,
+        models.Occupancy.data_source,
+    )
+    total = 0
+    while True:
+        rows = db.query(*columns).filter(
+            models.Occupancy.timestamp < cutoff
+        ).order_by(models.Occupancy.id).limit(chunk_size).all()
+        if not rows:
+            break
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        _write_chunk(rows)
+        db.query(models.Occupancy).filter(
+            models.Occupancy.id.in_([r.id for r in rows])
+        ).delete(synchronize_session=False)
+        db.commit()
+        total += len(rows)
+    return total
+
+
+def read_archive(columns, since=None, until=None, zone_ids=None):
+    """Load archived occupancy as a DataFrame, reading only `columns`.
+
+    Time and zone filters are pushed down to the Parquet scan, so
+    partitions and row groups outside the range are skipped.
+    """
+    if not os.path.isdir(ARCHIVE_DIR):
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(ARCHIVE_DIR, format="parquet", partitioning=PARTITIONING)
+
+    predicate = None
+    def _and(expr):
+        return expr if predicate is None else predicate & expr
+    if since is not None:
+        predicate = _and(ds.field("timestamp") >= pa.scalar(since, pa.timestamp("us")))
+        predicate = _and(ds.field("month") >= since.strftime("%Y-%m"))
+    if until is not None:
+        predicate = _and(ds.field("timestamp") < pa.scalar(until, pa.timestamp("us")))
+        predicate = _and(ds.field("month") <= until.strftime("%Y-%m"))
+    if zone_ids is not None:
+        predicate = _and(ds.field("zone_id").isin(list(zone_ids)))
+
+    # The row key is always read so chunks duplicated by an interrupted run
+    # collapse; `id` alone is reused by SQLite after the hot table empties
+    scan_columns = list(dict.fromkeys([*ROW_KEY, *columns]))
+    df = dataset.to_table(columns=scan_columns, filter=predicate).to_pandas()
+    df = df.drop_duplicates(subset=list(ROW_KEY))
+    return df[list(columns)].reset_index(drop=True)
+
+
+def run_archive():
+    db = SessionLocal()
+    try:
+        count = archive_occupancy(db)
+        print(f"Archived {count} occupancy rows older than {ARCHIVE_HORIZON_DAYS} days to {ARCHIVE_DIR}")
+        return count
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_archive()
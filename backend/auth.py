@@ -1,24 +1,64 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+import time
 from jose import JWTError, jwt
-import bcrypt
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from backend import models, database
+from backend.cache import TTLCache
+from backend.hashing import hasher_pool, hash_password, check_password, HasherBusy
 
 # Configuration
 SECRET_KEY = "your-secret-key-for-demo-purposes" # In production, use environment variables
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours
 
+# Decoded token -> principal cache, so hot authenticated endpoints skip the users query
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAX_ENTRIES = 4096
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    id: int
+    email: str
+    is_admin: bool
+
+_principal_cache = TTLCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/users/login")
 
 def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    if not hashed_password:
+        return False
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return hash_password(password)
+
+def _hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+async def verify_password_async(plain_password, hashed_password):
+    # Accounts created through Google SSO have no local password
+    if not hashed_password:
+        return False
+    try:
+        return await hasher_pool.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise _hasher_busy_exception()
+
+async def get_password_hash_async(password):
+    try:
+        return await hasher_pool.hash(password)
+    except HasherBusy:
+        raise _hasher_busy_exception()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -30,12 +70,46 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def invalidate_user(user_id: int):
+    """Evict cached principals for a user whose role or profile changed."""
+    _principal_cache.discard_where(lambda p: p.id == user_id)
+
+def clear_user_cache():
+    _principal_cache.clear()
+
+def _load_principal(db: Session, email: str):
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if user is None:
+        return None
+    return UserPrincipal(id=user.id, email=user.email, is_admin=bool(user.is_admin))
+
+async def principal_from_token(token: str):
+    """Resolve a bearer token outside the dependency system; None if invalid."""
+    principal = _principal_cache.get(token)
+    if principal is not None:
+        return principal
+    try:
+        email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+    if email is None:
+        return None
+    db = database.SessionLocal()
+    try:
+        return await run_in_threadpool(_load_principal, db, email)
+    finally:
+        db.close()
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    principal = _principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -44,15 +118,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
+    # The session is synchronous; keep the query off the event loop
+    principal = await run_in_threadpool(_load_principal, db, email)
+    if principal is None:
         raise credentials_exception
-    return user
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+    # Never cache a principal past the token's own expiry
+    ttl = USER_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    _principal_cache.set(token, principal, ttl_seconds=ttl)
+    return principal
+
+async def get_current_active_user(current_user: UserPrincipal = Depends(get_current_user)):
     return current_user
 
-async def get_admin_user(current_user: models.User = Depends(get_current_user)):
+async def get_admin_user(current_user: UserPrincipal = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,53 @@
+import datetime
+import sys
+import time
+import numpy as np
+from backend import ml_engine
+
+# Throughput of batch inference with per-tree uncertainty against plain
+# model.predict on the same feature frame. Exits non-zero when the
+# overhead exceeds the budget. Run from the repo root after training:
+#   python -m backend.bench_inference
+
+BATCH_SIZES = [1, 100, 2000, 20000]
+REPEATS = 5
+# Allowed slowdown of predict_with_uncertainty relative to model.predict
+OVERHEAD_BUDGET = 1.5
+
+
+def best_of(fn, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_benchmarks():
+    model, _ = ml_engine.load_model()
+    if model is None:
+        print("No trained model found; run python -m backend.ml_engine first.")
+        return 1
+
+    rng = np.random.default_rng(42)
+    start = datetime.datetime(2026, 1, 1)
+    worst = 0.0
+    print(f"{'rows':>8}{'predict ms':>12}{'uncert ms':>12}{'overhead':>10}{'rows/s':>12}")
+    for size in BATCH_SIZES:
+        zone_idxs = rng.integers(0, 150, size)
+        times = [start + datetime.timedelta(hours=int(h)) for h in rng.integers(0, 24 * 365, size)]
+        features = ml_engine.build_features(zone_idxs, times)
+
+        plain = best_of(lambda: model.predict(features))
+        full = best_of(lambda: ml_engine.predict_with_uncertainty(zone_idxs, times))
+        overhead = full / plain
+        worst = max(worst, overhead)
+        print(f"{size:>8}{plain * 1000:>12.2f}{full * 1000:>12.2f}{overhead:>9.2f}x{size / full:>12.0f}")
+
+    print(f"Worst overhead {worst:.2f}x (budget {OVERHEAD_BUDGET:.2f}x)")
+    return 0 if worst <= OVERHEAD_BUDGET else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_benchmarks())
@@ -0,0 +1,88 @@
+import datetime
+import gzip
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from backend.database import SessionLocal
+from backend import models, schemas, projections
+from backend.responses import ORJSONResponse
+
+# CPU cost per response of the list endpoints: the previous ORM + Pydantic
+# + stdlib json path versus column projection + orjson.
+# Run from the repo root: python -m backend.bench_responses
+
+ITERATIONS = 20
+
+
+def legacy_zones(db):
+    zones = db.query(models.Zone).all()
+    for zone in zones:
+        latest = db.query(models.Occupancy).filter(
+            models.Occupancy.zone_id == zone.zone_id
+        ).order_by(models.Occupancy.timestamp.desc()).first()
+        zone.current_occupancy = latest.occupied_spots if latest else 0
+        zone.current_availability = 100 - latest.occupancy_percentage if latest else 100
+    validated = TypeAdapter(list[schemas.Zone]).validate_python(zones, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def legacy_users(db):
+    users = db.query(models.User).all()
+    validated = TypeAdapter(list[schemas.User]).validate_python(users, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def legacy_history(db, zone_id, since):
+    history = db.query(models.Occupancy).filter(
+        models.Occupancy.zone_id == zone_id,
+        models.Occupancy.timestamp >= since
+    ).order_by(models.Occupancy.timestamp.asc()).all()
+    records = [{"timestamp": h.timestamp, "availability": 100 - h.occupancy_percentage} for h in history]
+    return json.dumps(jsonable_encoder({"records": records})).encode()
+
+
+def fast_history(db, zone_id, since):
+    history = projections.occupancy_history(db, zone_id, since)
+    records = [{"timestamp": h.timestamp, "availability": 100 - h.occupancy_percentage} for h in history]
+    return ORJSONResponse({"records": records}).body
+
+
+def measure(fn, *args):
+    body = fn(*args)  # warm caches
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        fn(*args)
+    cpu_ms = (time.process_time() - start) * 1000 / ITERATIONS
+    return cpu_ms, len(body), len(gzip.compress(body))
+
+
+def run_benchmarks():
+    db = SessionLocal()
+    try:
+        zone = db.query(models.Zone.zone_id).first()
+        latest = db.query(models.Occupancy.timestamp).order_by(models.Occupancy.timestamp.desc()).first()
+        since = (latest.timestamp if latest else datetime.datetime.utcnow()) - datetime.timedelta(days=7)
+        cases = [
+            ("/api/v1/zones", (legacy_zones, db), (lambda d: ORJSONResponse(projections.zone_rows(d)).body, db)),
+            ("/api/v1/admin/users", (legacy_users, db), (lambda d: ORJSONResponse(projections.user_rows(d)).body, db)),
+        ]
+        if zone:
+            cases.append((
+                f"/api/v1/zones/{zone.zone_id}/history",
+                (legacy_history, db, zone.zone_id, since),
+                (fast_history, db, zone.zone_id, since),
+            ))
+
+        print(f"{'endpoint':<40}{'before ms':>10}{'after ms':>10}{'speedup':>9}{'bytes':>10}{'gzip':>9}")
+        for name, before, after in cases:
+            before_ms, _, _ = measure(*before)
+            after_ms, size, gz = measure(*after)
+            speedup = before_ms / after_ms if after_ms else float("inf")
+            print(f"{name:<40}{before_ms:>10.2f}{after_ms:>10.2f}{speedup:>8.1f}x{size:>10}{gz:>9}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_benchmarks()
@@ -18,3 +18,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def ensure_indexes():
+    """Create indexes declared on models that predate them in an existing database."""
+    # Failures propagate so a deploy's migrate step exits non-zero
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,227 @@
+import datetime
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy.orm import Session
+from backend import models
+from backend.cache import TTLCache
+from backend.log_sink import LogSink, log_sink
+
+# Matched (prediction, actual) pairs kept for the fleet-wide and per-zone windows
+DRIFT_WINDOW = int(os.getenv("DRIFT_WINDOW", "500"))
+DRIFT_ZONE_WINDOW = int(os.getenv("DRIFT_ZONE_WINDOW", "50"))
+# Retrain once live MAE exceeds training MAE by this factor
+DRIFT_THRESHOLD = float(os.getenv("DRIFT_THRESHOLD", "1.3"))
+DRIFT_MIN_OBSERVATIONS = int(os.getenv("DRIFT_MIN_OBSERVATIONS", "200"))
+RETRAIN_COOLDOWN_SECONDS = int(os.getenv("RETRAIN_COOLDOWN_SECONDS", str(6 * 3600)))
+# A failed retrain leaves the drifted model in service, so try again sooner
+RETRAIN_FAILURE_BACKOFF_SECONDS = int(os.getenv("RETRAIN_FAILURE_BACKOFF_SECONDS", "600"))
+
+# Served forecasts are persisted through a buffered sink, one per zone-hour
+prediction_sink = LogSink(table=models.Prediction.__table__)
+
+
+def hour_bucket(ts: datetime.datetime):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+class RollingError:
+    """Error statistics over the last `window` observations, O(1) per update."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._items = deque()
+        self.sum_abs = 0.0
+        self.sum_sq = 0.0
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+
+    def add(self, actual: float, predicted: float):
+        err = actual - predicted
+        item = (abs(err), err * err, actual, actual * actual)
+        self._items.append(item)
+        self._apply(item, 1)
+        if len(self._items) > self.window:
+            self._apply(self._items.popleft(), -1)
+
+    def _apply(self, item, sign):
+        self.sum_abs += sign * item[0]
+        self.sum_sq += sign * item[1]
+        self.sum_y += sign * item[2]
+        self.sum_y2 += sign * item[3]
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def mae(self):
+        return self.sum_abs / self.count if self.count else None
+
+    def r2(self):
+        n = self.count
+        if n < 2:
+            return None
+        sst = self.sum_y2 - self.sum_y * self.sum_y / n
+        return 1 - self.sum_sq / sst if sst > 1e-9 else None
+
+
+class DriftMonitor:
+    """Joins stored predictions with ingested actuals and retrains on drift."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recorded = TTLCache(max_entries=200000, ttl_seconds=3600)
+        self._reset_windows(None)
+        self.retraining = False
+        self.retrains = 0
+        self.retrain_failures = 0
+        self._next_retrain_at = None
+
+    def _reset_windows(self, model_version):
+        self.model_version = model_version
+        self.fleet = RollingError(DRIFT_WINDOW)
+        self.zones = {}
+        self.matched = 0
+        self.unmatched = 0
+        self.last_drift_ratio = None
+
+    def reset(self, model_version=None):
+        with self._lock:
+            self._reset_windows(model_version)
+
+    def record_prediction(self, zone_id: str, prediction_time: datetime.datetime, availability: float,
+                          confidence: float, model_version: str):
+        key = (zone_id, hour_bucket(prediction_time), model_version)
+        if self._recorded.get(key):
+            return
+        self._recorded.set(key, True)
+        prediction_sink.submit({
+            "zone_id": zone_id,
+            "prediction_time": prediction_time,
+            "predicted_availability": float(availability),
+            "confidence_score": confidence,
+            "model_version": model_version,
+            "created_at": datetime.datetime.utcnow(),
+        })
+
+    def observe(self, db: Session, actuals, model_version: str, baseline_mae: float = None):
+        """Score ingested actuals against the predictions stored for their hour.
+
+        `actuals` are dicts with zone_id, timestamp and occupancy_percentage.
+        Returns the number of actuals that had a matching prediction.
+        """
+        if not actuals or model_version is None:
+            return 0
+        # Make sure recently served forecasts are queryable
+        prediction_sink.flush()
+        zone_ids = {a["zone_id"] for a in actuals}
+        start = min(hour_bucket(a["timestamp"]) for a in actuals)
+        end = max(hour_bucket(a["timestamp"]) for a in actuals) + datetime.timedelta(hours=1)
+        stored = db.query(
+            models.Prediction.zone_id,
+            models.Prediction.prediction_time,
+            models.Prediction.predicted_availability
+        ).filter(
+            models.Prediction.zone_id.in_(zone_ids),
+            models.Prediction.prediction_time >= start,
+            models.Prediction.prediction_time < end,
+            models.Prediction.model_version == model_version
+        ).order_by(models.Prediction.prediction_id).all()
+        # Latest stored forecast wins for each zone-hour
+        forecasts = {(p.zone_id, hour_bucket(p.prediction_time)): p.predicted_availability for p in stored}
+
+        matched = 0
+        with self._lock:
+            if model_version != self.model_version:
+                self._reset_windows(model_version)
+            for a in actuals:
+                predicted = forecasts.get((a["zone_id"], hour_bucket(a["timestamp"])))
+                if predicted is None:
+                    self.unmatched += 1
+                    continue
+                actual = 100 - a["occupancy_percentage"]
+                self.fleet.add(actual, predicted)
+                zone = self.zones.get(a["zone_id"])
+                if zone is None:
+                    zone = self.zones[a["zone_id"]] = RollingError(DRIFT_ZONE_WINDOW)
+                zone.add(actual, predicted)
+                matched += 1
+            self.matched += matched
+        self._check_drift(baseline_mae)
+        return matched
+
+    def _check_drift(self, baseline_mae):
+        with self._lock:
+            live_mae, count = self.fleet.mae(), self.fleet.count
+            if live_mae is None or not baseline_mae:
+                return
+            self.last_drift_ratio = live_mae / baseline_mae
+            if count < DRIFT_MIN_OBSERVATIONS or self.last_drift_ratio < DRIFT_THRESHOLD:
+                return
+            if self._next_retrain_at is not None and time.monotonic() < self._next_retrain_at:
+                return
+            if not self._begin_retrain_locked():
+                return
+        log_sink.emit("warning", f"Drift detected: live MAE {live_mae:.2f}% vs trained {baseline_mae:.2f}%, retraining", "ML Engine")
+        threading.Thread(target=self._retrain, name="drift-retrain", daemon=True).start()
+
+    def _begin_retrain_locked(self):
+        if self.retraining:
+            return False
+        self.retraining = True
+        return True
+
+    def begin_retrain(self) -> bool:
+        """Claim the single retrain slot; False if a retrain is already running."""
+        with self._lock:
+            return self._begin_retrain_locked()
+
+    def end_retrain(self, succeeded: bool):
+        with self._lock:
+            self.retraining = False
+            if succeeded:
+                self.retrains += 1
+                self._next_retrain_at = time.monotonic() + RETRAIN_COOLDOWN_SECONDS
+                self._reset_windows(None)
+            else:
+                self.retrain_failures += 1
+                self._next_retrain_at = time.monotonic() + RETRAIN_FAILURE_BACKOFF_SECONDS
+
+    def _retrain(self):
+        from backend import ml_engine  # heavy, and only needed when drift fires
+        succeeded = False
+        try:
+            model, mae, r2 = ml_engine.train_model()
+            succeeded = True
+            log_sink.emit("info", f"Drift retrain complete. MAE: {mae:.2f}%, R2: {r2:.2f}", "ML Engine")
+        except Exception as e:
+            log_sink.emit("error", f"Drift retrain failed: {e}", "ML Engine")
+        finally:
+            self.end_retrain(succeeded)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model_version": self.model_version,
+                "live_mae": self.fleet.mae(),
+                "live_r2": self.fleet.r2(),
+                "observations": self.fleet.count,
+                "matched": self.matched,
+                "unmatched": self.unmatched,
+                "drift_ratio": self.last_drift_ratio,
+                "threshold": DRIFT_THRESHOLD,
+                "retraining": self.retraining,
+                "retrains": self.retrains,
+                "retrain_failures": self.retrain_failures,
+            }
+
+    def zone_stats(self):
+        with self._lock:
+            return {
+                zone_id: {"mae": errors.mae(), "observations": errors.count}
+                for zone_id, errors in self.zones.items()
+            }
+
+
+drift_monitor = DriftMonitor()
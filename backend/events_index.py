@@ -0,0 +1,128 @@
+import datetime
+import math
+import threading
+import time
+from sqlalchemy.orm import Session
+from backend import models
+
+# Events that ended more than this long ago are left out of the index
+INDEX_LOOKBACK = datetime.timedelta(days=1)
+# Rebuild at least this often so events inserted outside the API show up
+INDEX_MAX_AGE_SECONDS = 600
+EARTH_RADIUS_KM = 6371.0
+
+
+class IntervalTree:
+    """Static centered interval tree over (start, end, item) triples.
+
+    `overlapping(t0, t1)` returns every item whose [start, end] intersects
+    [t0, t1] in O(log n + k).
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals):
+        starts = sorted(i[0] for i in intervals)
+        self.center = starts[len(starts) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def overlapping(self, t0, t1):
+        found = []
+        node = self
+        stack = []
+        while node is not None or stack:
+            if node is None:
+                node = stack.pop()
+            if t1 < node.center:
+                # Every interval here ends at or after center > t1
+                for interval in node.by_start:
+                    if interval[0] > t1:
+                        break
+                    found.append(interval[2])
+                node = node.left
+            elif t0 > node.center:
+                # Every interval here starts at or before center < t0
+                for interval in node.by_end:
+                    if interval[1] < t0:
+                        break
+                    found.append(interval[2])
+                node = node.right
+            else:
+                found.extend(i[2] for i in node.by_start)
+                if node.right is not None:
+                    stack.append(node.right)
+                node = node.left
+        return found
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class EventIndex:
+    def __init__(self):
+        self._tree = None
+        self._built_at = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session):
+        cutoff = datetime.datetime.utcnow() - INDEX_LOOKBACK
+        rows = db.query(
+            models.Event.event_id,
+            models.Event.event_name,
+            models.Event.event_type,
+            models.Event.start_time,
+            models.Event.end_time,
+            models.Event.latitude,
+            models.Event.longitude,
+            models.Event.venue,
+            models.Event.expected_attendance,
+        ).filter(models.Event.end_time >= cutoff).all()
+        intervals = [(r.start_time, r.end_time, r._asdict()) for r in rows]
+        tree = IntervalTree(intervals) if intervals else None
+        with self._lock:
+            self._tree, self._size = tree, len(intervals)
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def active(self, db: Session, t0, t1, lat=None, lon=None, radius_km=None):
+        """Events overlapping [t0, t1], optionally within radius_km of (lat, lon)."""
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > INDEX_MAX_AGE_SECONDS:
+            self.rebuild(db)
+        tree = self._tree
+        if tree is None:
+            return []
+        events = tree.overlapping(t0, t1)
+        if radius_km is not None and lat is not None and lon is not None:
+            events = [
+                e for e in events
+                if e["latitude"] is not None and e["longitude"] is not None
+                and distance_km(lat, lon, e["latitude"], e["longitude"]) <= radius_km
+            ]
+        return sorted(events, key=lambda e: e["start_time"])
+
+    def stats(self):
+        return {"events": self._size, "built": self._built_at is not None}
+
+
+event_index = EventIndex()
@@ -0,0 +1,168 @@
+import base64
+import json
+import os
+import re
+import threading
+import time
+
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_ISSUERS = os.getenv("GOOGLE_ISSUERS", "accounts.google.com,https://accounts.google.com").split(",")
+# Offline / test deployments can point this at a JSON file of {kid: PEM cert}
+GOOGLE_CERTS_FILE = os.getenv("GOOGLE_CERTS_FILE")
+
+DEFAULT_MAX_AGE_SECONDS = 3600
+REFRESH_MARGIN_SECONDS = 300
+# Unknown key ids force a refetch, but no more often than this
+MIN_FORCED_REFRESH_SECONDS = 60
+CLOCK_SKEW_SECONDS = 10
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def parse_max_age(headers) -> int:
+    """Freshness lifetime from Cache-Control max-age minus Age, or the default."""
+    lowered = {k.lower(): v for k, v in (headers or {}).items()}
+    match = _MAX_AGE_RE.search(lowered.get("cache-control", ""))
+    if not match:
+        return DEFAULT_MAX_AGE_SECONDS
+    try:
+        age = int(lowered.get("age", 0))
+    except ValueError:
+        age = 0
+    return max(0, int(match.group(1)) - age)
+
+
+class GoogleCertSource:
+    """Fetches Google's signing certificates over HTTPS."""
+
+    def __init__(self, url: str = GOOGLE_CERTS_URL):
+        self.url = url
+
+    def fetch(self):
+        # Imported lazily so the transport is only loaded once SSO is used
+        from google.auth.transport import requests as google_requests
+        response = google_requests.Request()(self.url, method="GET")
+        if response.status != 200:
+            raise ValueError(f"Could not fetch certificates at {self.url}: HTTP {response.status}")
+        return json.loads(response.data), parse_max_age(response.headers)
+
+
+class StaticCertSource:
+    """Serves a fixed key set, e.g. from a stand-in issuer when testing offline."""
+
+    def __init__(self, certs: dict, max_age_seconds: int = DEFAULT_MAX_AGE_SECONDS):
+        self.certs = dict(certs)
+        self.max_age_seconds = max_age_seconds
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def fetch(self):
+        return dict(self.certs), self.max_age_seconds
+
+
+class CertCache:
+    def __init__(self, source, refresh_margin: int = REFRESH_MARGIN_SECONDS):
+        self.source = source
+        self.refresh_margin = refresh_margin
+        self._certs = None
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def _refresh(self):
+        try:
+            certs, max_age = self.source.fetch()
+        except Exception:
+            with self._lock:
+                self.fetch_errors += 1
+            raise
+        with self._lock:
+            self._certs = certs
+            self._fetched_at = time.monotonic()
+            self._expires_at = self._fetched_at + max_age
+            self.fetches += 1
+        return certs
+
+    def _background_refresh(self):
+        try:
+            self._refresh()
+        except Exception as e:
+            print(f"Google cert refresh failed: {e}")
+        finally:
+            self._refreshing = False
+
+    def get_certs(self, force: bool = False):
+        now = time.monotonic()
+        certs, expires_at = self._certs, self._expires_at
+        if force and self._fetched_at is not None and now - self._fetched_at < MIN_FORCED_REFRESH_SECONDS:
+            force = False
+        if force or certs is None or now >= expires_at:
+            return self._refresh()
+        # Still valid but close to expiry: serve cached keys and refresh off-path
+        if now >= expires_at - self.refresh_margin and not self._refreshing:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._background_refresh, daemon=True).start()
+        return certs
+
+    def stats(self):
+        return {
+            "keys": len(self._certs or {}),
+            "expires_in": max(0, round(self._expires_at - time.monotonic())),
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+        }
+
+
+def _token_kid(token: str):
+    try:
+        header = token.split(".")[0]
+        header += "=" * (-len(header) % 4)
+        return json.loads(base64.urlsafe_b64decode(header)).get("kid")
+    except Exception:
+        raise ValueError("Malformed token header")
+
+
+def _default_source():
+    if GOOGLE_CERTS_FILE:
+        return StaticCertSource.from_file(GOOGLE_CERTS_FILE)
+    return GoogleCertSource()
+
+
+cert_cache = CertCache(_default_source())
+
+
+def set_cert_source(source):
+    """Swap the key source, dropping any cached keys."""
+    global cert_cache
+    cert_cache = CertCache(source)
+
+
+def verify_id_token(token: str, audience: str = None, issuers=None):
+    """Verify a Google ID token against cached certificates.
+
+    Mirrors `id_token.verify_oauth2_token`, but the signature check runs
+    in memory; the network is only touched when the cache is cold,
+    expired, or the token was signed by a key we have not seen yet.
+    Raises ValueError on any verification failure.
+    """
+    from google.auth import jwt
+
+    kid = _token_kid(token)
+    certs = cert_cache.get_certs()
+    if kid is not None and kid not in certs:
+        # Google rotated its keys ahead of our cached expiry
+        certs = cert_cache.get_certs(force=True)
+
+    id_info = jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=CLOCK_SKEW_SECONDS)
+    if id_info.get("iss") not in (issuers or GOOGLE_ISSUERS):
+        raise ValueError(f"Wrong issuer: {id_info.get('iss')}")
+    return id_info
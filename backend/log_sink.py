@@ -0,0 +1,195 @@
+import datetime
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy.exc import DataError, IntegrityError
+from backend.database import SessionLocal
+from backend import models
+
+LOG_FLUSH_BATCH_SIZE = int(os.getenv("LOG_FLUSH_BATCH_SIZE", "100"))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", "1.0"))
+LOG_MAX_PENDING = int(os.getenv("LOG_MAX_PENDING", "10000"))
+# 'drop' discards new entries when full, 'block' waits up to LOG_BLOCK_TIMEOUT_SECONDS first
+LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop")
+LOG_BLOCK_TIMEOUT_SECONDS = float(os.getenv("LOG_BLOCK_TIMEOUT_SECONDS", "0.5"))
+
+
+class LogSink:
+    """Buffers rows in memory and writes them to `table` in batches.
+
+    Used for system logs by default. Entries stay in the pending buffer
+    until their batch is committed, so readers can merge them with what
+    is already in the database.
+    """
+
+    def __init__(self, batch_size=LOG_FLUSH_BATCH_SIZE, interval=LOG_FLUSH_INTERVAL_SECONDS,
+                 max_pending=LOG_MAX_PENDING, policy=LOG_OVERFLOW_POLICY,
+                 block_timeout=LOG_BLOCK_TIMEOUT_SECONDS, session_factory=SessionLocal, table=None):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.session_factory = session_factory
+        self.table = models.SystemLog.__table__ if table is None else table
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def _ensure_started(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name=f"sink-{self.table.name}", daemon=True)
+            self._thread.start()
+
+    def emit(self, level: str, message: str, source: str) -> bool:
+        return self.submit({
+            "timestamp": datetime.datetime.utcnow(),
+            "level": level,
+            "message": message,
+            "source": source,
+        })
+
+    def submit(self, entry: dict) -> bool:
+        with self._cond:
+            if len(self._pending) >= self.max_pending and self.policy == "block":
+                deadline = time.monotonic() + self.block_timeout
+                while len(self._pending) >= self.max_pending and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.notify_all()
+                    self._cond.wait(remaining)
+            if len(self._pending) >= self.max_pending or self._closed:
+                self.dropped += 1
+                return False
+            self._pending.append(entry)
+            self.enqueued += 1
+            self._ensure_started()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _write(self, batch):
+        db = self.session_factory()
+        try:
+            db.execute(self.table.insert(), batch)
+            db.commit()
+        finally:
+            db.close()
+
+    def _write_each(self, batch):
+        """Write a rejected batch row by row, dropping rows the database refuses.
+
+        Returns (rows handled, rows written). Stops at the first error that
+        is not about the row itself, so the remainder is retried later.
+        """
+        handled = written = 0
+        for row in batch:
+            try:
+                self._write([row])
+                written += 1
+            except (IntegrityError, DataError) as e:
+                with self._cond:
+                    self.errors += 1
+                    self.dropped += 1
+                print(f"Dropped {self.table.name} row rejected by the database: {e}")
+            except Exception as e:
+                with self._cond:
+                    self.errors += 1
+                print(f"Flush to {self.table.name} failed: {e}")
+                break
+            handled += 1
+        return handled, written
+
+    def flush(self) -> int:
+        """Write everything pending right now; returns the number of rows written."""
+        with self._flush_lock:
+            return self._flush_pending()
+
+    def _flush_pending(self):
+        total = 0
+        while True:
+            with self._cond:
+                batch = [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+            if not batch:
+                return total
+            try:
+                self._write(batch)
+                handled = written = len(batch)
+            except (IntegrityError, DataError):
+                # One bad row must not hold back everything queued behind it
+                handled, written = self._write_each(batch)
+            except Exception as e:
+                # Connection trouble: keep the batch and retry on the next flush
+                with self._cond:
+                    self.errors += 1
+                print(f"Flush to {self.table.name} failed: {e}")
+                return total
+            with self._cond:
+                for _ in range(handled):
+                    self._pending.popleft()
+                self.written += written
+                self.flushes += 1
+                self._cond.notify_all()
+            total += written
+            if handled < len(batch):
+                return total
+
+    def _run(self):
+        backoff = False
+        while True:
+            with self._cond:
+                # After a failed write wait out the interval instead of spinning
+                if (backoff or len(self._pending) < self.batch_size) and not self._closed:
+                    self._cond.wait(self.interval)
+                closing = self._closed
+            backoff = self.flush() == 0 and len(self._pending) > 0
+            if closing:
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def pending(self, limit: int):
+        """Newest unflushed entries first."""
+        with self._cond:
+            return list(reversed(self._pending))[:limit]
+
+    def recent(self, limit: int, read_stored):
+        """Newest `limit` entries: pending ones, then `read_stored(n)` from the table.
+
+        Holds the flush lock across both reads so no entry is seen both as
+        pending and as a stored row.
+        """
+        with self._flush_lock:
+            pending = self.pending(limit)
+            stored = read_stored(limit - len(pending)) if len(pending) < limit else []
+        return pending + stored
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "errors": self.errors,
+                "policy": self.policy,
+            }
+
+
+log_sink = LogSink()
@@ -0,0 +1,23 @@
+from sqlalchemy import func, select
+from backend import models
+from backend.database import engine, ensure_indexes
+
+def remove_duplicate_favorites():
+    """Keep the first row per (user_id, zone_id) so the unique favorites index can be built."""
+    favorites = models.UserFavorite.__table__
+    first_ids = select(func.min(favorites.c.id)).group_by(favorites.c.user_id, favorites.c.zone_id)
+    with engine.begin() as conn:
+        removed = conn.execute(favorites.delete().where(favorites.c.id.not_in(first_ids))).rowcount
+    if removed:
+        print(f"Removed {removed} duplicate favorites")
+    return removed
+
+def migrate():
+    """Create missing tables and indexes. Run once per deploy, before the API starts."""
+    models.Base.metadata.create_all(bind=engine)
+    remove_duplicate_favorites()
+    ensure_indexes()
+
+if __name__ == "__main__":
+    migrate()
+    print("Database schema is up to date.")
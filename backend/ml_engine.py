@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
 from backend.database import SessionLocal
-from backend import models
+from backend import models, archive
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
@@ -10,21 +10,36 @@ import joblib
 import os
 import datetime
 
-MODEL_PATH = "backend/models/parking_model.joblib"
-if not os.path.exists("backend/models"):
-    os.makedirs("backend/models")
-
-def get_training_data(db: Session):
-    # Load occupancy data
-    query = db.query(models.Occupancy).all()
-    data = []
-    for q in query:
-        data.append({
-            'zone_id': q.zone_id,
-            'timestamp': q.timestamp,
-            'occupancy_percentage': q.occupancy_percentage
-        })
-    df = pd.DataFrame(data)
+MODEL_DIR = "backend/models"
+MODEL_PATH = f"{MODEL_DIR}/parking_model.joblib"
+MAE_PATH = f"{MODEL_DIR}/latest_mae.joblib"
+R2_PATH = f"{MODEL_DIR}/latest_r2.joblib"
+# Ratio of test-set MAE to mean per-tree spread, so spreads read as expected error
+UNCERTAINTY_SCALE_PATH = f"{MODEL_DIR}/uncertainty_scale.joblib"
+# Two-sided 80% interval under a normal approximation of the tree spread
+INTERVAL_Z = 1.2816
+FEATURE_COLUMNS = ['zone_id_cat', 'hour', 'day_of_week', 'is_weekend', 'hour_sin', 'hour_cos', 'month_sin', 'month_cos']
+
+TRAINING_COLUMNS = ['zone_id', 'timestamp', 'occupancy_percentage']
+# Limit how far back training reads (days); unset trains on all history
+TRAINING_HISTORY_DAYS = os.getenv("TRAINING_HISTORY_DAYS")
+
+def get_training_data(db: Session, since: datetime.datetime = None):
+    if since is None and TRAINING_HISTORY_DAYS:
+        since = datetime.datetime.utcnow() - datetime.timedelta(days=int(TRAINING_HISTORY_DAYS))
+
+    # Cold tier: archived Parquet, reading only the needed columns and range
+    cold = archive.read_archive(TRAINING_COLUMNS, since=since)
+
+    # Hot tier: recent rows still in the primary database
+    query = db.query(models.Occupancy.zone_id, models.Occupancy.timestamp, models.Occupancy.occupancy_percentage)
+    if since is not None:
+        query = query.filter(models.Occupancy.timestamp >= since)
+    hot = pd.DataFrame(query.all(), columns=TRAINING_COLUMNS)
+
+    df = pd.concat([frame for frame in (cold, hot) if len(frame)] or [hot], ignore_index=True)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['occupancy_percentage'] = df['occupancy_percentage'].astype(float)
     
     # Feature Engineering
     df['hour'] = df['timestamp'].dt.hour
@@ -48,7 +63,7 @@ def train_model():
     try:
         df = get_training_data(db)
         
-        X = df[['zone_id_cat', 'hour', 'day_of_week', 'is_weekend', 'hour_sin', 'hour_cos', 'month_sin', 'month_cos']]
+        X = df[FEATURE_COLUMNS]
         y = df['occupancy_percentage']
         
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -61,16 +76,22 @@ def train_model():
         
         model.fit(X_train, y_train)
         
-        predictions = model.predict(X_test)
+        per_tree = tree_predictions(model, X_test)
+        predictions = per_tree.mean(axis=0)
         mae = mean_absolute_error(y_test, predictions)
         r2 = r2_score(y_test, predictions)
+        mean_spread = float(per_tree.std(axis=0).mean())
+        uncertainty_scale = mae / mean_spread if mean_spread > 0 else 1.0
         
         # Save feature importance
         importance = model.feature_importances_
         feature_names = X.columns
         importance_map = dict(zip(feature_names, importance.tolist()))
+        os.makedirs(MODEL_DIR, exist_ok=True)
         joblib.dump(importance_map, "backend/models/feature_importance.joblib")
-        joblib.dump(float(mae), "backend/models/latest_mae.joblib")
+        joblib.dump(float(mae), MAE_PATH)
+        joblib.dump(float(r2), R2_PATH)
+        joblib.dump(float(uncertainty_scale), UNCERTAINTY_SCALE_PATH)
         
         print(f"Model trained. MAE: {mae:.2f}, R2: {r2:.2f}")
         
@@ -79,46 +100,138 @@ def train_model():
     finally:
         db.close()
 
-def predict_availability(zone_id_int, time: datetime.datetime):
-    if not os.path.exists(MODEL_PATH):
+# Model and MAE are cached in-process and reloaded only when the model file changes
+_model_cache = {"mtime": None, "model": None, "mae": None, "uncertainty_scale": 1.0}
+
+def load_model():
+    try:
+        mtime = os.path.getmtime(MODEL_PATH)
+    except OSError:
         return None, None
-        
-    model = joblib.load(MODEL_PATH)
-    
-    hour = time.hour
-    day_of_week = time.weekday()
-    month = time.month
-    is_weekend = 1 if day_of_week >= 5 else 0
-    hour_sin = np.sin(2 * np.pi * hour / 24)
-    hour_cos = np.cos(2 * np.pi * hour / 24)
-    month_sin = np.sin(2 * np.pi * (month-1) / 12)
-    month_cos = np.cos(2 * np.pi * (month-1) / 12)
-    
-    features = pd.DataFrame([{
-        'zone_id_cat': zone_id_int,
+    if _model_cache["mtime"] != mtime:
+        model = joblib.load(MODEL_PATH)
+        try:
+            scale = float(joblib.load(UNCERTAINTY_SCALE_PATH))
+        except:
+            scale = 1.0
+        _model_cache.update(mtime=mtime, model=model, mae=get_latest_mae(), uncertainty_scale=scale)
+    return _model_cache["model"], _model_cache["mae"]
+
+def get_latest_mae():
+    try:
+        return float(joblib.load(MAE_PATH))
+    except:
+        return None
+
+def get_latest_r2():
+    try:
+        return float(joblib.load(R2_PATH))
+    except:
+        return None
+
+def model_trained_at():
+    try:
+        return datetime.datetime.fromtimestamp(os.path.getmtime(MODEL_PATH))
+    except OSError:
+        return None
+
+def model_version():
+    """Identifier of the model currently served, derived from its file mtime."""
+    trained_at = model_trained_at()
+    return f"rf-{int(trained_at.timestamp())}" if trained_at else None
+
+def zone_index(zone_id: str) -> int:
+    # Numeric part of the ID, matching the legacy per-zone lookup
+    try:
+        return int(zone_id.split('_')[1]) - 1
+    except:
+        return 0
+
+def build_features(zone_idxs, times):
+    """Vectorised feature frame for parallel sequences of zone indices and times."""
+    times = pd.DatetimeIndex(times)
+    hour = np.asarray(times.hour)
+    day_of_week = np.asarray(times.weekday)
+    month = np.asarray(times.month)
+    return pd.DataFrame({
+        'zone_id_cat': np.asarray(zone_idxs),
         'hour': hour,
         'day_of_week': day_of_week,
-        'is_weekend': is_weekend,
-        'hour_sin': hour_sin,
-        'hour_cos': hour_cos,
-        'month_sin': month_sin,
-        'month_cos': month_cos
-    }])
-    
-    prediction = model.predict(features)[0]
+        'is_weekend': (day_of_week >= 5).astype(int),
+        'hour_sin': np.sin(2 * np.pi * hour / 24),
+        'hour_cos': np.cos(2 * np.pi * hour / 24),
+        'month_sin': np.sin(2 * np.pi * (month-1) / 12),
+        'month_cos': np.cos(2 * np.pi * (month-1) / 12)
+    }, columns=FEATURE_COLUMNS)
+
+def _confidence(mae):
+    if mae is None:
+        return 85.0
+    return float(max(50.0, 100.0 - (mae * 1.5))) # Rough heuristic
+
+def tree_predictions(model, features):
+    """Per-tree outputs of the forest, shape (n_trees, n_rows).
+
+    Their mean is exactly what `model.predict` returns, so the spread
+    comes out of the same pass rather than a second evaluation.
+    """
+    X = np.ascontiguousarray(np.asarray(features, dtype=np.float32))
+    out = np.empty((len(model.estimators_), len(X)))
+    for i, tree in enumerate(model.estimators_):
+        out[i] = tree.predict(X, check_input=False)
+    return out
+
+def predict_with_uncertainty(zone_idxs, times):
+    """Availability with per-prediction confidence and an 80% interval.
+
+    Returns a dict of numpy arrays (availability, confidence, lower, upper),
+    or None when no model has been trained yet.
+    """
+    model, mae = load_model()
+    if model is None:
+        return None
+    if len(zone_idxs) == 0:
+        empty = np.empty(0)
+        return {"availability": empty, "confidence": empty, "lower": empty, "upper": empty}
+
+    features = build_features(zone_idxs, times)
+    if hasattr(model, "estimators_"):
+        per_tree = tree_predictions(model, features)
+        prediction = per_tree.mean(axis=0)
+        # Tree spread rescaled to expected absolute error, as the old MAE heuristic used
+        expected_error = per_tree.std(axis=0) * _model_cache["uncertainty_scale"]
+        confidence = np.maximum(50.0, 100.0 - expected_error * 1.5)
+        half_width = INTERVAL_Z * expected_error
+    else:
+        prediction = model.predict(features)
+        confidence = np.full(len(prediction), _confidence(mae))
+        half_width = np.zeros(len(prediction))
+
     # Clamp to [0, 100]
-    prediction = max(0.0, min(100.0, prediction))
-    
-    availability = 100 - prediction
-    
-    # Calculate confidence based on MAE
-    try:
-        mae = joblib.load("backend/models/latest_mae.joblib")
-        confidence = max(50.0, 100.0 - (mae * 1.5)) # Rough heuristic
-    except:
-        confidence = 85.0
-    
-    return availability, float(confidence)
+    availability = 100 - np.clip(prediction, 0.0, 100.0)
+    return {
+        "availability": availability,
+        "confidence": confidence,
+        "lower": 100 - np.clip(prediction + half_width, 0.0, 100.0),
+        "upper": 100 - np.clip(prediction - half_width, 0.0, 100.0),
+    }
+
+def predict_availability_batch(zone_idxs, times):
+    """Predict availability for many (zone, time) pairs in one model call.
+
+    Returns (availabilities, confidences) as numpy arrays, or (None, None)
+    when no model has been trained yet.
+    """
+    result = predict_with_uncertainty(zone_idxs, times)
+    if result is None:
+        return None, None
+    return result["availability"], result["confidence"]
+
+def predict_availability(zone_id_int, time: datetime.datetime):
+    availability, confidence = predict_availability_batch([zone_id_int], [time])
+    if availability is None:
+        return None, None
+    return float(availability[0]), float(confidence[0])
 
 def get_feature_importance():
     try:
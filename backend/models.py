@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, DECIMAL
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, DECIMAL, Index
 from sqlalchemy.orm import relationship
 from backend.database import Base
 import datetime
@@ -29,6 +29,10 @@ class UserFavorite(Base):
     user = relationship("User", back_populates="favorites")
     zone = relationship("Zone")
 
+    __table_args__ = (
+        Index("ix_user_favorites_user_zone", "user_id", "zone_id", unique=True),
+    )
+
 class Zone(Base):
     __tablename__ = "zones"
 
@@ -61,14 +65,18 @@ class Occupancy(Base):
 
     zone = relationship("Zone", back_populates="occupancy_records")
 
+    __table_args__ = (
+        Index("ix_occupancy_zone_timestamp", "zone_id", "timestamp"),
+    )
+
 class Event(Base):
     __tablename__ = "events"
 
     event_id = Column(Integer, primary_key=True, index=True)
     event_name = Column(String, nullable=False)
     event_type = Column(String)
-    start_time = Column(DateTime, nullable=False)
-    end_time = Column(DateTime, nullable=False)
+    start_time = Column(DateTime, nullable=False, index=True)
+    end_time = Column(DateTime, nullable=False, index=True)
     latitude = Column(Float)
     longitude = Column(Float)
     venue = Column(String)
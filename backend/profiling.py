@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+# Profiles are stored as folded stacks ("frame;frame;frame count" per line),
+# which flamegraph.pl, speedscope and inferno all read directly.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "backend/profiles")
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+# Profile 1 in N requests per route; 0 disables sampling mode
+PROFILE_SAMPLE_EVERY_N = int(os.getenv("PROFILE_SAMPLE_EVERY_N", "0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+# Upper bound on requests being profiled at once, to cap the overhead
+PROFILE_MAX_CONCURRENT = 2
+
+# Leaf frames in these modules are threads parked waiting for work
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", "thread.py")
+_PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class StackSampler:
+    """Samples every other thread's Python stack at a fixed interval.
+
+    Sync endpoints run on threadpool workers and async ones on the event
+    loop, so all busy threads are sampled; concurrent requests can show up
+    in the same profile.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fold(self, thread_name, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+            frame = frame.f_back
+        stack.append(thread_name)
+        stack.reverse()
+        return ";".join(stack)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                self.counts[self._fold(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+
+class Profiler:
+    def __init__(self, directory=PROFILE_DIR, ring_size=PROFILE_RING_SIZE, sample_every=PROFILE_SAMPLE_EVERY_N):
+        self.directory = directory
+        self.ring_size = ring_size
+        self.sample_every = sample_every
+        self._route_counts = Counter()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def should_sample(self, route: str) -> bool:
+        if not self.sample_every:
+            return False
+        with self._lock:
+            self._route_counts[route] += 1
+            return self._route_counts[route] % self.sample_every == 0
+
+    def begin(self):
+        """Start a sampler, or return None if too many profiles are running."""
+        with self._lock:
+            if self._active >= PROFILE_MAX_CONCURRENT:
+                return None
+            self._active += 1
+        sampler = StackSampler()
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler, route: str, duration_ms: float) -> str:
+        counts = sampler.stop()
+        with self._lock:
+            self._active -= 1
+        profile_id = uuid.uuid4().hex
+        os.makedirs(self.directory, exist_ok=True)
+        safe_route = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_")[:80]
+        path = os.path.join(self.directory, f"{int(time.time() * 1000)}-{profile_id}-{safe_route}.folded")
+        with open(path, "w") as f:
+            meta = {"route": route, "duration_ms": round(duration_ms, 1), "samples": sampler.samples}
+            f.write(f"# {json.dumps(meta)}\n")
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        self._trim()
+        return profile_id
+
+    def _files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(n for n in os.listdir(self.directory) if n.endswith(".folded"))
+
+    def _trim(self):
+        files = self._files()
+        for name in files[:max(0, len(files) - self.ring_size)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def list(self):
+        profiles = []
+        for name in reversed(self._files()):
+            created_ms, profile_id, _ = name.split("-", 2)
+            with open(os.path.join(self.directory, name)) as f:
+                meta = json.loads(f.readline()[2:])
+            profiles.append({
+                "id": profile_id,
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(int(created_ms) / 1000)),
+                **meta,
+            })
+        return profiles
+
+    def read(self, profile_id: str):
+        if not _PROFILE_ID_RE.match(profile_id):
+            return None
+        for name in self._files():
+            if f"-{profile_id}-" in name:
+                with open(os.path.join(self.directory, name)) as f:
+                    # Drop the metadata header so the body is plain folded stacks
+                    return "".join(line for line in f if not line.startswith("#"))
+        return None
+
+
+profiler = Profiler()
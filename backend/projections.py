@@ -0,0 +1,91 @@
+# Column projections for read-only list endpoints: each helper selects only
+# the columns a response needs and returns plain dicts, skipping ORM object
+# hydration and Pydantic validation.
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from backend import models
+
+ZONE_COLUMNS = (
+    models.Zone.zone_id,
+    models.Zone.zone_name,
+    models.Zone.zone_type,
+    models.Zone.district,
+    models.Zone.latitude,
+    models.Zone.longitude,
+    models.Zone.total_capacity,
+    models.Zone.hourly_rate,
+    models.Zone.operating_hours,
+    models.Zone.created_at,
+    models.Zone.updated_at,
+)
+
+USER_COLUMNS = (
+    models.User.id,
+    models.User.email,
+    models.User.name,
+    models.User.is_admin,
+    models.User.state,
+    models.User.country,
+    models.User.pincode,
+    models.User.address_line,
+    models.User.created_at,
+)
+
+
+def latest_occupancy(db: Session, zone_ids=None):
+    """Latest occupancy row per zone as {zone_id: {occupied_spots, occupancy_percentage}}."""
+    if zone_ids is not None and not zone_ids:
+        return {}
+    latest_ts = db.query(
+        models.Occupancy.zone_id,
+        func.max(models.Occupancy.timestamp).label("timestamp")
+    )
+    if zone_ids is not None:
+        latest_ts = latest_ts.filter(models.Occupancy.zone_id.in_(zone_ids))
+    latest_ts = latest_ts.group_by(models.Occupancy.zone_id).subquery()
+    rows = db.query(
+        models.Occupancy.zone_id,
+        models.Occupancy.occupied_spots,
+        models.Occupancy.occupancy_percentage
+    ).join(
+        latest_ts,
+        (models.Occupancy.zone_id == latest_ts.c.zone_id) & (models.Occupancy.timestamp == latest_ts.c.timestamp)
+    ).all()
+    return {
+        r.zone_id: {"occupied_spots": r.occupied_spots, "occupancy_percentage": r.occupancy_percentage}
+        for r in rows
+    }
+
+
+def zone_rows(db: Session, zone_ids=None):
+    query = db.query(*ZONE_COLUMNS)
+    if zone_ids is not None:
+        query = query.filter(models.Zone.zone_id.in_(zone_ids))
+    latest = latest_occupancy(db, zone_ids)
+    rows = []
+    for r in query.all():
+        row = r._asdict()
+        record = latest.get(row["zone_id"])
+        if record:
+            row["current_occupancy"] = record["occupied_spots"]
+            row["current_availability"] = 100 - record["occupancy_percentage"]
+        else:
+            row["current_occupancy"] = 0
+            row["current_availability"] = 100
+        rows.append(row)
+    return rows
+
+
+def user_rows(db: Session):
+    return [r._asdict() for r in db.query(*USER_COLUMNS).all()]
+
+
+def occupancy_history(db: Session, zone_id: str, since):
+    """(timestamp, occupancy_percentage) tuples for a zone, oldest first."""
+    return db.query(
+        models.Occupancy.timestamp,
+        models.Occupancy.occupancy_percentage
+    ).filter(
+        models.Occupancy.zone_id == zone_id,
+        models.Occupancy.timestamp >= since
+    ).order_by(models.Occupancy.timestamp.asc()).all()
@@ -0,0 +1,12 @@
+from typing import Any
+import orjson
+from starlette.responses import Response
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson (native datetime and numpy support)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -1,7 +1,11 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from typing import List, Optional
 from datetime import datetime
 
+MAX_BATCH_ZONES = 500
+MAX_GRID_ZONES = 5000
+MAX_SEARCH_PAGE = 200
+
 class UserBase(BaseModel):
     email: EmailStr
     name: str
@@ -43,6 +47,12 @@ class Zone(ZoneBase):
         "from_attributes": True
     }
 
+class ZoneSearchPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    results: List[Zone]
+
 class OccupancyBase(BaseModel):
     zone_id: str
     timestamp: datetime
@@ -102,19 +112,32 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 class PredictionBatchRequest(BaseModel):
-    zone_ids: List[str]
+    zone_ids: List[str] = Field(..., max_length=MAX_BATCH_ZONES)
     time: Optional[datetime] = None
 
 class PredictionBatchResponse(BaseModel):
     predictions: List[dict]
 
+class ForecastGridRequest(BaseModel):
+    zone_ids: Optional[List[str]] = Field(None, max_length=MAX_GRID_ZONES)
+    district: Optional[str] = None
+    start: Optional[datetime] = None
+    horizon_hours: int = Field(24, ge=1, le=168)
+    step_minutes: int = Field(60, ge=15, le=1440)
+
+    @model_validator(mode="after")
+    def check_zone_selector(self):
+        if (self.zone_ids is None) == (self.district is None):
+            raise ValueError("Provide exactly one of zone_ids or district")
+        return self
+
 class SystemLogBase(BaseModel):
     message: str
     level: str
     source: str
 
 class SystemLog(SystemLogBase):
-    id: int
+    id: Optional[int] = None  # None while the entry is still buffered
     timestamp: datetime
 
     model_config = {
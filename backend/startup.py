@@ -0,0 +1,62 @@
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+
+_PROCESS_T0 = time.perf_counter()
+
+STARTUP_REPORT = {
+    "imports": {},
+    "warmup": {},
+    "main_imported_ms": None,
+    "ready_ms": None,
+    "warmup_done_ms": None,
+}
+_report_lock = threading.Lock()
+
+
+def _since_start_ms():
+    return round((time.perf_counter() - _PROCESS_T0) * 1000, 1)
+
+
+@contextmanager
+def timed(section: str, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _report_lock:
+            STARTUP_REPORT[section][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def mark(name: str):
+    with _report_lock:
+        STARTUP_REPORT[name] = _since_start_ms()
+
+
+def report():
+    with _report_lock:
+        return {
+            "imports": dict(STARTUP_REPORT["imports"]),
+            "warmup": dict(STARTUP_REPORT["warmup"]),
+            "main_imported_ms": STARTUP_REPORT["main_imported_ms"],
+            "ready_ms": STARTUP_REPORT["ready_ms"],
+            "warmup_done_ms": STARTUP_REPORT["warmup_done_ms"],
+        }
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            with timed("imports", self._name):
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
@@ -0,0 +1,373 @@
+import bisect
+import os
+import re
+import threading
+import time
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from backend import models, projections
+
+# Check the zones table for changes at most this often
+ZONE_INDEX_SYNC_SECONDS = int(os.getenv("ZONE_INDEX_SYNC_SECONDS", "30"))
+# Latest occupancy per zone is refreshed on this cadence for availability filters
+ZONE_AVAILABILITY_MAX_AGE_SECONDS = int(os.getenv("ZONE_AVAILABILITY_MAX_AGE_SECONDS", "60"))
+# Cached unions for typeahead prefixes, dropped when a matching token changes
+PREFIX_CACHE_SIZE = 4096
+SEARCH_FIELDS = ("zone_name", "district", "zone_type")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _zone_tokens(row):
+    return set(t for field in SEARCH_FIELDS for t in tokenize(row[field]))
+
+
+def _zone_facets(row):
+    return {(field, (row[field] or "").lower()) for field in ("district", "zone_type")}
+
+
+def _intersect(a, b, size):
+    """Intersection of two sorted id arrays over documents [0, size)."""
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return _EMPTY
+    if len(a) * 16 < len(b):
+        # Few probes: binary search the larger array
+        pos = np.searchsorted(b, a)
+        pos[pos == len(b)] = 0
+        return a[b[pos] == a]
+    member = np.zeros(size, dtype=bool)
+    member[b] = True
+    return a[member[a]]
+
+
+class _IndexState:
+    """One immutable generation of the index; queries read whichever is current.
+
+    Documents are numbered in (zone_name, zone_id) order on a full build,
+    so result pages come back alphabetically. Zones added incrementally
+    are appended until the next full build.
+    """
+
+    def __init__(self, records, postings, facets, capacity, rate, occupied, availability, alive,
+                 doc_of=None, vocab=None, prefix_cache=None):
+        self.records = records
+        self.doc_of = doc_of if doc_of is not None else {r["zone_id"]: doc for doc, r in enumerate(records)}
+        self.postings = postings
+        self.vocab = vocab if vocab is not None else sorted(postings)
+        self.facets = facets
+        self.capacity = capacity
+        self.rate = rate
+        self.occupied = occupied
+        self.availability = availability
+        self.alive = alive
+        self.live = int(alive.sum())
+        # Prefix unions depend only on the postings, so occupancy refreshes keep them
+        self.prefix_cache = prefix_cache if prefix_cache is not None else {}
+        # Single characters union the most postings; pay for them up front
+        for first in {token[0] for token in self.vocab}:
+            if first not in self.prefix_cache:
+                self.prefix(first)
+
+    def prefix(self, text):
+        ids = self.prefix_cache.get(text)
+        if ids is not None:
+            return ids
+        lo = bisect.bisect_left(self.vocab, text)
+        hi = bisect.bisect_left(self.vocab, text + "\x7f")
+        if hi - lo == 1:
+            ids = self.postings[self.vocab[lo]]
+        elif hi > lo:
+            member = np.zeros(len(self.records), dtype=bool)
+            member[np.concatenate([self.postings[t] for t in self.vocab[lo:hi]])] = True
+            ids = np.flatnonzero(member)
+        else:
+            ids = _EMPTY
+        if len(self.prefix_cache) < PREFIX_CACHE_SIZE:
+            self.prefix_cache[text] = ids
+        return ids
+
+
+def _arrays(records):
+    n = len(records)
+    capacity = np.fromiter((r["total_capacity"] for r in records), dtype=np.int64, count=n)
+    rate = np.fromiter(
+        (r["hourly_rate"] if r["hourly_rate"] is not None else np.nan for r in records),
+        dtype=np.float64, count=n
+    )
+    return capacity, rate
+
+
+def build_state(rows, latest=None):
+    """Build a fresh index generation from zone projection dicts."""
+    records = sorted(rows, key=lambda r: (r["zone_name"], r["zone_id"]))
+    postings, facets = {}, {}
+    for doc, row in enumerate(records):
+        for token in _zone_tokens(row):
+            postings.setdefault(token, []).append(doc)
+        for key in _zone_facets(row):
+            facets.setdefault(key, []).append(doc)
+    postings = {t: np.array(ids, dtype=np.int64) for t, ids in postings.items()}
+    facets = {k: np.array(ids, dtype=np.int64) for k, ids in facets.items()}
+    capacity, rate = _arrays(records)
+    n = len(records)
+    state = _IndexState(
+        records, postings, facets, capacity, rate,
+        np.zeros(n, dtype=np.int64), np.full(n, 100.0), np.ones(n, dtype=bool)
+    )
+    return with_occupancy(state, latest) if latest else state
+
+
+def with_occupancy(state, latest):
+    """Copy of `state` with occupancy and availability taken from `latest`."""
+    n = len(state.records)
+    # Zones without readings count as empty, matching /api/v1/zones
+    occupied = np.zeros(n, dtype=np.int64)
+    availability = np.full(n, 100.0)
+    for zone_id, record in latest.items():
+        doc = state.doc_of.get(zone_id)
+        if doc is not None:
+            occupied[doc] = record["occupied_spots"]
+            availability[doc] = 100 - record["occupancy_percentage"]
+    return _IndexState(
+        state.records, state.postings, state.facets, state.capacity, state.rate,
+        occupied, availability, state.alive,
+        doc_of=state.doc_of, vocab=state.vocab, prefix_cache=state.prefix_cache
+    )
+
+
+def _without(ids, doc):
+    return ids[ids != doc]
+
+
+def _with(ids, doc):
+    pos = np.searchsorted(ids, doc)
+    if pos < len(ids) and ids[pos] == doc:
+        return ids
+    return np.insert(ids, pos, doc)
+
+
+def apply_changes(state, changed_rows, removed_ids):
+    """Next index generation with `changed_rows` upserted and `removed_ids` dropped.
+
+    Only the postings of tokens touched by the changed zones are rewritten.
+    """
+    records = list(state.records)
+    postings = dict(state.postings)
+    facets = dict(state.facets)
+    doc_of = dict(state.doc_of)
+    vocab_changed = False
+    touched = set()
+    occupied, availability, alive = state.occupied.copy(), state.availability.copy(), state.alive.copy()
+
+    def unlink(doc):
+        nonlocal vocab_changed
+        old = records[doc]
+        touched.update(_zone_tokens(old))
+        for token in _zone_tokens(old):
+            remaining = _without(postings[token], doc)
+            if len(remaining):
+                postings[token] = remaining
+            else:
+                del postings[token]
+                vocab_changed = True
+        for key in _zone_facets(old):
+            facets[key] = _without(facets[key], doc)
+
+    appended = []
+    for zone_id in removed_ids:
+        doc = doc_of.get(zone_id)
+        if doc is not None and alive[doc]:
+            unlink(doc)
+            alive[doc] = False
+    for row in changed_rows:
+        doc = doc_of.get(row["zone_id"])
+        if doc is None:
+            doc = doc_of[row["zone_id"]] = len(records)
+            records.append(row)
+            appended.append(doc)
+        else:
+            if alive[doc]:
+                unlink(doc)
+            records[doc] = row
+            alive[doc] = True
+        touched.update(_zone_tokens(row))
+        for token in _zone_tokens(row):
+            if token not in postings:
+                vocab_changed = True
+            postings[token] = _with(postings.get(token, _EMPTY), doc)
+        for key in _zone_facets(row):
+            facets[key] = _with(facets.get(key, _EMPTY), doc)
+
+    if appended:
+        extra = len(appended)
+        occupied = np.concatenate([occupied, np.zeros(extra, dtype=np.int64)])
+        availability = np.concatenate([availability, np.full(extra, 100.0)])
+        alive = np.concatenate([alive, np.ones(extra, dtype=bool)])
+    capacity, rate = _arrays(records[len(state.records):])
+    capacity = np.concatenate([state.capacity, capacity])
+    rate = np.concatenate([state.rate, rate])
+    for row in changed_rows:
+        doc = doc_of[row["zone_id"]]
+        capacity[doc] = row["total_capacity"]
+        rate[doc] = row["hourly_rate"] if row["hourly_rate"] is not None else np.nan
+    # Cached unions stay valid unless one of their tokens changed
+    prefix_cache = {
+        prefix: ids for prefix, ids in state.prefix_cache.items()
+        if not any(token.startswith(prefix) for token in touched)
+    }
+    return _IndexState(
+        records, postings, facets, capacity, rate, occupied, availability, alive,
+        doc_of=doc_of, vocab=None if vocab_changed else state.vocab, prefix_cache=prefix_cache
+    )
+
+
+class ZoneIndex:
+    """In-memory search index over zones with prefix matching and numeric filters."""
+
+    def __init__(self):
+        self._state = None
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._checked_at = None
+        self._availability_at = None
+        self.full_builds = 0
+        self.incremental_updates = 0
+
+    def rebuild(self, db: Session):
+        with self._lock:
+            self._rebuild(db)
+
+    def _rebuild(self, db):
+        latest_update = db.query(func.max(models.Zone.updated_at)).scalar()
+        rows = [r._asdict() for r in db.query(*projections.ZONE_COLUMNS).all()]
+        self._state = build_state(rows, projections.latest_occupancy(db))
+        self._watermark = latest_update
+        self._checked_at = self._availability_at = time.monotonic()
+        self.full_builds += 1
+
+    def _sync(self, db):
+        count, latest_update = db.query(func.count(models.Zone.zone_id), func.max(models.Zone.updated_at)).one()
+        state = self._state
+        if latest_update == self._watermark and count == state.live:
+            return
+        changed = []
+        if self._watermark is not None:
+            changed = [
+                r._asdict() for r in db.query(*projections.ZONE_COLUMNS)
+                .filter(models.Zone.updated_at >= self._watermark).all()
+            ]
+        removed = []
+        added = {
+            r["zone_id"] for r in changed
+            if r["zone_id"] not in state.doc_of or not state.alive[state.doc_of[r["zone_id"]]]
+        }
+        if state.live + len(added) != count:
+            current = {zone_id for (zone_id,) in db.query(models.Zone.zone_id)}
+            removed = [z for z in state.doc_of if z not in current]
+        state = apply_changes(state, changed, removed)
+        if state.live != count:
+            # Rows written without a fresh updated_at; start over
+            self._rebuild(db)
+            return
+        if changed:
+            state = with_occupancy(state, projections.latest_occupancy(db))
+            self._availability_at = time.monotonic()
+        self._state = state
+        self._watermark = latest_update
+        self.incremental_updates += 1
+
+    def invalidate(self):
+        """Force a change check on the next search, e.g. after editing zones."""
+        self._checked_at = None
+
+    def _ensure_fresh(self, db):
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self._rebuild(db)
+            return
+        now = time.monotonic()
+        zones_due = self._checked_at is None or now - self._checked_at > ZONE_INDEX_SYNC_SECONDS
+        availability_due = now - self._availability_at > ZONE_AVAILABILITY_MAX_AGE_SECONDS
+        if not (zones_due or availability_due):
+            return
+        # One request refreshes; the rest keep answering from the current state
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if zones_due:
+                self._sync(db)
+                self._checked_at = time.monotonic()
+            if time.monotonic() - self._availability_at > ZONE_AVAILABILITY_MAX_AGE_SECONDS:
+                self._state = with_occupancy(self._state, projections.latest_occupancy(db))
+                self._availability_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def search(self, db: Session, q=None, district=None, zone_type=None, min_capacity=None,
+               max_rate=None, min_availability=None, limit=20, offset=0):
+        self._ensure_fresh(db)
+        return search_state(self._state, q, district, zone_type, min_capacity,
+                            max_rate, min_availability, limit, offset)
+
+    def stats(self):
+        state = self._state
+        return {
+            "zones": state.live if state else 0,
+            "tokens": len(state.postings) if state else 0,
+            "full_builds": self.full_builds,
+            "incremental_updates": self.incremental_updates,
+        }
+
+
+def search_state(state, q=None, district=None, zone_type=None, min_capacity=None,
+                 max_rate=None, min_availability=None, limit=20, offset=0):
+    """Matching zones as {"total", "results"}; every query token is a prefix match."""
+    size = len(state.records)
+    candidates = None
+    for token in dict.fromkeys(tokenize(q)):
+        ids = state.prefix(token)
+        candidates = ids if candidates is None else _intersect(candidates, ids, size)
+    for field, value in (("district", district), ("zone_type", zone_type)):
+        if value:
+            ids = state.facets.get((field, value.lower()), _EMPTY)
+            candidates = ids if candidates is None else _intersect(candidates, ids, size)
+    filters = [
+        (column, bound, keep) for column, bound, keep in (
+            (state.capacity, min_capacity, np.greater_equal),
+            (state.rate, max_rate, np.less_equal),
+            (state.availability, min_availability, np.greater_equal),
+        ) if bound is not None
+    ]
+    if candidates is None:
+        # No text or facet terms: scan whole columns rather than gathering
+        mask = state.alive.copy()
+        for column, bound, keep in filters:
+            mask &= keep(column, bound)
+        matched = np.flatnonzero(mask)
+    else:
+        # Postings never hold removed zones, so only the numeric filters need a mask
+        mask = None
+        for column, bound, keep in filters:
+            passed = keep(column[candidates], bound)
+            mask = passed if mask is None else mask & passed
+        matched = candidates if mask is None else candidates[mask]
+
+    results = []
+    for doc in matched[offset:offset + limit].tolist():
+        row = dict(state.records[doc])
+        row["current_occupancy"] = int(state.occupied[doc])
+        row["current_availability"] = float(state.availability[doc])
+        results.append(row)
+    return {"total": len(matched), "results": results}
+
+
+zone_index = ZoneIndex()
@@ -1,4 +1,6 @@
 @echo off
+echo Applying database migrations...
+python -m backend.migrate
 echo Starting Backend Server...
 python -m uvicorn backend.main:app --reload --port 8000
 pause